@@ -1,29 +1,215 @@
 """Common utilities for github plugins"""
 
-from github import Github
-from github.GithubObject import GithubObject, NotSet
+import json
+import os
+from dataclasses import fields
+from functools import lru_cache
+from urllib.parse import urlencode
+
+__all__ = [
+    "DEFAULT_API_URL",
+    "GithubObjectConfig",
+    "conditional_get",
+    "ghclient",
+    "ghconnect",
+    "ghrepo",
+    "prime_cache",
+]
 
 DEFAULT_API_URL = "https://api.github.com"
 
+# share one connection pool per client so repeated API calls reuse the
+# underlying TLS session rather than reconnecting for each request
+CONNECTION_POOL_SIZE = 32
+
+
+def ghclient(token, base_url=None):
+    """Return a cached API client for the given credentials."""
+    if base_url is None:
+        base_url = DEFAULT_API_URL
+
+    return _ghclient(token, base_url)
+
 
 def ghconnect(token, organization=None, base_url=None):
+    """Connect to the Github API and return the owner for the given credentials."""
     if base_url is None:
         base_url = DEFAULT_API_URL
 
-    client = Github(base_url=base_url, login_or_token=token)
+    return _ghconnect(token, organization, base_url)
+
+
+@lru_cache(maxsize=8)
+def _ghclient(token, base_url):
+    # defer the github import (and the large module tree it pulls in) until a
+    # caller actually needs the API
+    from github import Github
+    from github.GithubRetry import GithubRetry
+
+    # GithubRetry inspects 403 responses to tell rate limits (retried, waiting
+    # on Retry-After or the limit reset) apart from permission errors (raised
+    # immediately), and forwards the backoff settings to urllib3
+    retry = GithubRetry(total=5, backoff_factor=0.5, backoff_max=60)
+
+    return Github(
+        base_url=base_url,
+        login_or_token=token,
+        retry=retry,
+        pool_size=CONNECTION_POOL_SIZE,
+    )
+
+
+@lru_cache(maxsize=8)
+def _ghconnect(token, organization, base_url):
+    client = _ghclient(token, base_url)
 
     return client.get_organization(organization) if organization else client.get_user()
 
 
+def ghrepo(repo, token=None, organization=None, base_url=None):
+    """Return the named repository for the given credentials.
+
+    Lookups are cached, so managers created for the same repository within one
+    process share a single resolved object rather than repeating the API call.
+    """
+    if base_url is None:
+        base_url = DEFAULT_API_URL
+
+    return _ghrepo(repo, token, organization, base_url)
+
+
+@lru_cache(maxsize=32)
+def _ghrepo(repo, token, organization, base_url):
+    # a named owner makes the repo directly addressable, skipping the
+    # round-trip that resolves the owner first
+    if organization:
+        return _ghclient(token, base_url).get_repo(f"{organization}/{repo}")
+
+    return _ghconnect(token, None, base_url).get_repo(name=repo)
+
+
+# conditional request cache, mapping request keys to (etag, data) pairs; since
+# Ansible forks a fresh interpreter per task, the cache is persisted to disk so
+# validators survive across invocations
+_CACHE_FILE = os.path.expanduser("~/.ansible/github_etag_cache.json")
+
+# bound on the number of persisted entries; the least-recently-stored are
+# evicted first so the cache cannot grow without limit across repos and refs
+_CACHE_LIMIT = 1024
+
+_etag_cache = None
+
+
+def _get_cache():
+    global _etag_cache
+
+    if _etag_cache is None:
+        _etag_cache = {}
+
+        try:
+            with open(_CACHE_FILE) as fp:
+                _etag_cache.update(
+                    (key, tuple(entry)) for key, entry in json.load(fp).items()
+                )
+        except (OSError, ValueError):
+            pass
+
+    return _etag_cache
+
+
+def _save_cache():
+    # entries primed by local writes carry no etag and cannot be revalidated
+    # later, so only real responses are written out; persistence is
+    # best-effort and never fails the task
+    entries = {key: entry for key, entry in _etag_cache.items() if entry[0] is not None}
+
+    if len(entries) > _CACHE_LIMIT:
+        entries = dict(list(entries.items())[-_CACHE_LIMIT:])
+
+    try:
+        os.makedirs(os.path.dirname(_CACHE_FILE), exist_ok=True)
+
+        temp = f"{_CACHE_FILE}.{os.getpid()}"
+
+        with open(temp, "w") as fp:
+            json.dump(entries, fp)
+
+        os.chmod(temp, 0o600)
+        os.replace(temp, _CACHE_FILE)
+    except (OSError, TypeError, ValueError):
+        pass
+
+
+def _cache_key(url, params=None):
+    return url if not params else f"{url}?{urlencode(sorted(params.items()))}"
+
+
+def prime_cache(url, data, params=None):
+    """Record response data for a URL without an ETag, as after a local write.
+
+    Data recorded this way is served directly by `conditional_get` until it is
+    replaced by a real response.
+    """
+    _get_cache()[_cache_key(url, params=params)] = (None, data)
+
+
+def conditional_get(requester, url, params=None, strip=()):
+    """Issue a GET request, using a cached ETag when one is available.
+
+    When the server responds with `304 Not Modified`, the cached response data is
+    returned instead; a 304 does not count against the API rate limit.
+
+    Field names listed in `strip` are dropped from the cached copy (not the
+    returned data), keeping bulky payloads such as file content out of the
+    persisted cache.
+    """
+    cache = _get_cache()
+    key = _cache_key(url, params=params)
+    cached = cache.get(key)
+
+    # data primed by a local write has no etag to validate; serve it directly
+    if cached is not None and cached[0] is None:
+        return cached[1]
+
+    headers = {"If-None-Match": cached[0]} if cached else None
+
+    resp, data = requester.requestJsonAndCheck(
+        "GET", url, parameters=params, headers=headers
+    )
+
+    # a 304 response has no body; serve the cached data
+    if data is None and cached is not None:
+        return cached[1]
+
+    etag = resp.get("etag")
+
+    if etag is not None:
+        entry = data
+
+        if strip and isinstance(data, dict):
+            entry = {k: v for k, v in data.items() if k not in strip}
+
+        # re-insert so the entry moves to the back of the eviction order
+        cache.pop(key, None)
+        cache[key] = (etag, entry)
+        _save_cache()
+
+    return data
+
+
 class GithubObjectConfig:
     """Representation of a desired Github configuration for a specific resource."""
 
+    # subclasses are slotted dataclasses; keep the base free of __dict__
+    __slots__ = ()
+
     def __eq__(self, other):
         """Determine if the current config matches the other config.
 
         In this context, equality is used to determine if a resource should be changed.  It does not
         imply that the objects themselves are equal in all other aspects.
         """
+        from github.GithubObject import GithubObject, NotSet
 
         if isinstance(other, GithubObjectConfig):
             return self.__eq__(other.asdict())
@@ -32,15 +218,11 @@ class GithubObjectConfig:
             return self.__eq__(other.raw_data)
 
         if isinstance(other, dict):
-            for key, val in self:
-                if val == NotSet:
-                    continue
-
-                if key not in other:
-                    continue
-
-                if other[key] != val:
-                    return False
+            desired = {key: val for key, val in self if val is not NotSet}
+            shared = desired.keys() & other.keys()
+            return {key: desired[key] for key in shared} == {
+                key: other[key] for key in shared
+            }
 
         return True
 
@@ -49,15 +231,35 @@ class GithubObjectConfig:
 
     def __iter__(self):
         """Return all fields in this config, suitable for use in the Github API."""
-        for name, value in self.__dict__.items():
-            if value is None:
-                value = NotSet
+        yield from self.asdict().items()
+
+    @classmethod
+    def _field_names(cls):
+        """Return the API field names for this config, computed once per class."""
+        names = cls.__dict__.get("_API_FIELDS")
 
-            elif value == ...:
-                value = NotSet
+        if names is None:
+            # fields with a leading underscore are internal, not part of the API
+            names = tuple(
+                field.name for field in fields(cls) if not field.name.startswith("_")
+            )
+            cls._API_FIELDS = names
 
-            yield name, value
+        return names
 
     def asdict(self):
-        """Return the current config as a dictionary, suitable for use in the Github API."""
-        return dict(self)
+        """Return the current config as a dictionary, suitable for use in the Github API.
+
+        Values are referenced, not copied, so large payloads (such as file
+        content) are not duplicated on the way to the API.
+        """
+        from github.GithubObject import NotSet
+
+        data = {}
+
+        for name in self._field_names():
+            value = getattr(self, name)
+
+            data[name] = NotSet if value is None or value is ... else value
+
+        return data
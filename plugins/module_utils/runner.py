@@ -3,22 +3,28 @@
 from abc import ABC, abstractmethod
 
 from ansible.module_utils.basic import AnsibleModule
-from github import GithubException
 
 
 class TaskRunner(ABC):
-    def __init__(self, **spec):
-        self.module = AnsibleModule(argument_spec=spec, supports_check_mode=True)
+    __slots__ = ("module",)
+
+    def __init__(self, argument_spec):
+        self.module = AnsibleModule(
+            argument_spec=argument_spec, supports_check_mode=True
+        )
 
     @abstractmethod
     def apply(self, state, params=None, check_mode=False):
         """Apply the requested state."""
 
     def __call__(self):
+        # deferred so argument validation errors never pay the github import
+        from github import GithubException
+
         params = self.module.params
         check_mode = self.module.check_mode
 
-        state = params.pop("state")
+        state = params["state"]
 
         try:
             result = self.apply(state, params=params, check_mode=check_mode)
@@ -1,12 +1,18 @@
 """Manage Github repository collaorators."""
 
 from dataclasses import dataclass
+from urllib.parse import quote
 
-from ..module_utils.ghutil import GithubObjectConfig, ghconnect
+from ..module_utils.ghutil import GithubObjectConfig, ghrepo
 from ..module_utils.runner import TaskRunner
 
+# task-level parameters, as opposed to parameters for the collaborator itself
+_TASK_KEYS = frozenset(
+    {"access_token", "organization", "repository", "api_url", "state"}
+)
 
-@dataclass(eq=False)
+
+@dataclass(eq=False, slots=True)
 class CollaboratorConfig(GithubObjectConfig):
     """Configuration for collaborators."""
 
@@ -17,17 +23,37 @@ class CollaboratorConfig(GithubObjectConfig):
 class CollaboratorManager:
     """Manage collaborators in a Github repository."""
 
+    __slots__ = ("repo",)
+
     def __init__(self, repo, token=None, org=None, base_url=None):
-        owner = ghconnect(token, organization=org, base_url=base_url)
-        self.repo = owner.get_repo(name=repo)
+        self.repo = ghrepo(repo, token=token, organization=org, base_url=base_url)
+
+    def _get_permission(self, username):
+        """Return the collaborator's permission, or `None` for non-collaborators.
+
+        The permission endpoint answers both "is this user a collaborator?" and
+        "what permission do they have?" in a single request.
+        """
+        from github.GithubException import UnknownObjectException
+
+        url = f"{self.repo.url}/collaborators/{quote(username)}/permission"
+
+        try:
+            _, data = self.repo.requester.requestJsonAndCheck("GET", url)
+        except UnknownObjectException:
+            return None
+
+        permission = data.get("permission")
 
-    def absent(self, name, check_mode=False):
+        return None if permission == "none" else permission
+
+    def absent(self, config: CollaboratorConfig, check_mode=False):
         """Remove the collaborator from the repository."""
-        if not self.repo.has_in_collaborators(name):
+        if self._get_permission(config.username) is None:
             return {"changed": False}
 
         if not check_mode:
-            self.repo.remove_from_collaborators(name)
+            self.repo.remove_from_collaborators(config.username)
 
         return {"changed": True}
 
@@ -35,10 +61,7 @@ class CollaboratorManager:
         """Ensure that the collaaborator exists with the specified permissions."""
         result = {"changed": False, "username": config.username, "permission": None}
 
-        perm = None
-
-        if self.repo.has_in_collaborators(config.username):
-            perm = self.repo.get_collaborator_permission(config.username)
+        perm = self._get_permission(config.username)
 
         if perm != config.permission:
             result["changed"] = True
@@ -54,59 +77,65 @@ class CollaboratorManager:
 class CollaboratorRunner(TaskRunner):
     """Runner for the jheddings.github.collaborator task."""
 
+    __slots__ = ()
+
     def apply(self, state, params, check_mode=False):
         mod = CollaboratorManager(
-            token=params.pop("access_token", None),
-            org=params.pop("organization", None),
-            repo=params.pop("repository"),
-            base_url=params.pop("api_url", None),
+            token=params.get("access_token"),
+            org=params.get("organization"),
+            repo=params.get("repository"),
+            base_url=params.get("api_url"),
         )
 
-        cfg = CollaboratorConfig(**params)
-
-        if state == "absent":
-            result = mod.absent(cfg.username, check_mode=check_mode)
-
-        elif state == "present":
-            result = mod.present(cfg, check_mode=check_mode)
+        cfg = CollaboratorConfig(
+            **{k: v for k, v in params.items() if k not in _TASK_KEYS}
+        )
 
-        return result
+        actions = {
+            "absent": mod.absent,
+            "present": mod.present,
+        }
+
+        return actions[state](cfg, check_mode=check_mode)
+
+
+_ARG_SPEC = {
+    # task parameters
+    "access_token": {"type": "str", "no_log": True},
+    "organization": {"type": "str"},
+    "repository": {"type": "str", "required": True},
+    "api_url": {
+        "type": "str",
+        "default": "https://api.github.com",
+    },
+    "state": {
+        "type": "str",
+        "default": "present",
+        "choices": [
+            "present",
+            "absent",
+        ],
+    },
+    # collaborator parameters
+    "username": {"type": "str", "required": True},
+    "permission": {
+        "type": "str",
+        "default": "push",
+        "choices": [
+            "pull",
+            "triage",
+            "push",
+            "maintain",
+            "admin",
+        ],
+    },
+}
 
 
 def main():
     """Main module entry point."""
 
-    runner = CollaboratorRunner(
-        # task parameters
-        access_token={"type": "str", "no_log": True},
-        organization={"type": "str"},
-        repository={"type": "str", "required": True},
-        api_url={
-            "type": "str",
-            "default": "https://api.github.com",
-        },
-        state={
-            "type": "str",
-            "default": "present",
-            "choices": [
-                "present",
-                "absent",
-            ],
-        },
-        # collaborator parameters
-        username={"type": "str", "required": True},
-        permission={
-            "type": "str",
-            "default": "push",
-            "choices": [
-                "pull",
-                "triage",
-                "push",
-                "maintain",
-                "admin",
-            ],
-        },
-    )
+    runner = CollaboratorRunner(_ARG_SPEC)
 
     runner()
 
@@ -2,18 +2,41 @@
 
 # https://pygithub.readthedocs.io/en/latest/examples/Repository.html#get-a-specific-content-file
 
-from dataclasses import dataclass
-from typing import Any, Optional
-
-from github.ContentFile import ContentFile
-from github.GithubException import UnknownObjectException
-from github.GithubObject import NotSet
-
-from ..module_utils.ghutil import GithubObjectConfig, ghconnect
+import hashlib
+import mmap
+from dataclasses import dataclass, field
+from functools import partial
+from typing import TYPE_CHECKING, Any, Optional
+from urllib.parse import quote
+
+from ..module_utils.ghutil import (
+    GithubObjectConfig,
+    conditional_get,
+    ghrepo,
+    prime_cache,
+)
 from ..module_utils.runner import TaskRunner
 
-
-@dataclass(eq=False)
+# github imports are deferred to the methods that need them; Ansible forks a
+# fresh interpreter per task, and the PyGithub tree is expensive to import
+if TYPE_CHECKING:
+    from github.ContentFile import ContentFile
+
+# task-level parameters, as opposed to parameters for the file itself
+_TASK_KEYS = frozenset(
+    {
+        "access_token",
+        "organization",
+        "repository",
+        "branch",
+        "api_url",
+        "state",
+        "assume_absent",
+    }
+)
+
+
+@dataclass(eq=False, slots=True)
 class FileConfig(GithubObjectConfig):
     path: str
     message: str
@@ -21,19 +44,25 @@ class FileConfig(GithubObjectConfig):
     content: Optional[Any] = None
     source: Optional[str] = None
 
+    _blob_sha: Optional[str] = field(init=False, default=None, repr=False)
+
     def __eq__(self, other):
         """Compare the current configuration to another object.
 
         If the other object is a `ContentFile`, this method uses the file path and
         raw contents to determine equality
         """
+        from github.ContentFile import ContentFile
+
         if isinstance(other, ContentFile):
-            return all(
-                [
-                    self.path == other.path,
-                    self.content == other.decoded_content,
-                ]
-            )
+            if self.path != other.path:
+                return False
+
+            # the blob SHA identifies the content without decoding the body
+            if self._blob_sha is not None:
+                return self._blob_sha == other.sha
+
+            return self.content == other.decoded_content
 
         return super().__eq__(other)
 
@@ -43,34 +72,86 @@ class FileConfig(GithubObjectConfig):
         # if the caller provided source, load into content instead
         if self.source is not None:
             with open(self.source, "rb") as fp:
-                self.content = fp.read()
+                try:
+                    with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                        self.content = bytes(view)
+                except ValueError:
+                    # mmap cannot map an empty file
+                    self.content = fp.read()
 
             self.source = ...
 
+        # record the git blob SHA of the content for cheap comparisons
+        if self.content is not None:
+            data = (
+                self.content.encode()
+                if isinstance(self.content, str)
+                else bytes(self.content)
+            )
+            blob = b"blob %d\0" % len(data) + data
+            self._blob_sha = hashlib.sha1(blob).hexdigest()
+
 
 class FileManager:
     """Manage files in a Github repository."""
 
+    __slots__ = ("repo", "ref", "_missing")
+
     def __init__(self, repo, branch=None, token=None, org=None, base_url=None):
-        owner = ghconnect(token, organization=org, base_url=base_url)
-        self.repo = owner.get_repo(name=repo)
+        from github.GithubObject import NotSet
+
+        self.repo = ghrepo(repo, token=token, organization=org, base_url=base_url)
         self.ref = NotSet if branch is None else branch
+        self._missing = set()
+
+    def _content_url(self, path):
+        return f"{self.repo.url}/contents/{quote(path)}"
+
+    def _ref_params(self):
+        from github.GithubObject import NotSet
+
+        return None if self.ref is NotSet else {"ref": self.ref}
 
-    def get(self, path) -> ContentFile:
+    def get(self, path) -> "ContentFile":
         """Get the requested file from this manager.
 
-        If the file does not exist, this method returns `None`.
+        If the file does not exist, this method returns `None`.  When the file has
+        not changed since a previous call, it is rebuilt from the ETag cache rather
+        than downloaded again.
         """
-        file = None
+        from github.ContentFile import ContentFile
+        from github.GithubException import UnknownObjectException
+
+        if path in self._missing:
+            return None
+
+        params = self._ref_params()
 
         try:
-            file = self.repo.get_contents(path=path, ref=self.ref)
+            # the compare-and-write paths only need path and sha, so keep the
+            # base64 body out of the persisted ETag cache
+            data = conditional_get(
+                self.repo.requester,
+                self._content_url(path),
+                params=params,
+                strip=("content",),
+            )
         except UnknownObjectException:
+            self._missing.add(path)
             return None
 
         # TODO make sure we have a single file type
+        if isinstance(data, list):
+            return [
+                ContentFile(
+                    self.repo.requester, headers={}, attributes=item, completed=True
+                )
+                for item in data
+            ]
 
-        return file
+        return ContentFile(
+            self.repo.requester, headers={}, attributes=data, completed=True
+        )
 
     def absent(self, config: FileConfig, check_mode=False):
         """Delete the file using the configuration provided."""
@@ -81,16 +162,50 @@ class FileManager:
 
         if not check_mode:
             self.repo.delete_file(file.path, config.message, file.sha, branch=self.ref)
+            self._missing.add(config.path)
 
         return {"changed": True, "message": config.message}
 
-    def present(self, config: FileConfig, update=False, check_mode=False):
+    def present(
+        self, config: FileConfig, update=False, check_mode=False, assume_absent=False
+    ):
         """Ensure that the configured file exists.
 
         If the file does not exist, it will be created based on the provided
         configuration.  If the file exists, it will be modified to match the
         given configuration if requested.
+
+        When `assume_absent` is set, the file is created directly without the
+        usual existence probe; if it turns out to exist after all, this method
+        falls back to the probe-and-update path.
         """
+        if assume_absent and not check_mode:
+            from github.GithubException import GithubException
+
+            try:
+                created = self.repo.create_file(
+                    config.path,
+                    config.message,
+                    config.content,
+                    branch=self.ref,
+                )
+            except GithubException as err:
+                if err.status != 422:
+                    raise
+
+                # the file existed after all; take the normal path
+                return self.present(config, update=update, check_mode=check_mode)
+
+            file = created["content"]
+            self._missing.discard(config.path)
+            prime_cache(
+                self._content_url(config.path),
+                file.raw_data,
+                params=self._ref_params(),
+            )
+
+            return {"changed": True, "file": file.raw_data}
+
         result = {"changed": False, "file": None}
 
         file = self.get(path=config.path)
@@ -106,6 +221,12 @@ class FileManager:
                     branch=self.ref,
                 )
                 file = created["content"]
+                self._missing.discard(config.path)
+                prime_cache(
+                    self._content_url(config.path),
+                    file.raw_data,
+                    params=self._ref_params(),
+                )
 
         elif update and (config != file):
             result["changed"] = True
@@ -119,8 +240,13 @@ class FileManager:
                     branch=self.ref,
                 )
                 file = updated["content"]
+                prime_cache(
+                    self._content_url(config.path),
+                    file.raw_data,
+                    params=self._ref_params(),
+                )
 
-        result["file"] = file.raw_data
+        result["file"] = None if file is None else file.raw_data
 
         return result
 
@@ -135,53 +261,56 @@ class FileManager:
 class FileRunner(TaskRunner):
     """Runner for the jheddings.github.label task."""
 
+    __slots__ = ()
+
     def apply(self, state, params, check_mode=False):
         mgr = FileManager(
-            token=params.pop("access_token", None),
-            org=params.pop("organization", None),
-            repo=params.pop("repository"),
-            branch=params.pop("branch", None),
-            base_url=params.pop("api_url", None),
+            token=params.get("access_token"),
+            org=params.get("organization"),
+            repo=params.get("repository"),
+            branch=params.get("branch"),
+            base_url=params.get("api_url"),
         )
 
-        cfg = FileConfig(**params)
-
-        if state == "absent":
-            result = mgr.absent(cfg, check_mode=check_mode)
-
-        elif state == "present":
-            result = mgr.present(cfg, check_mode=check_mode)
-
-        elif state == "replace":
-            result = mgr.replace(cfg, check_mode=check_mode)
-
-        return result
+        cfg = FileConfig(**{k: v for k, v in params.items() if k not in _TASK_KEYS})
+
+        actions = {
+            "absent": mgr.absent,
+            "present": partial(mgr.present, assume_absent=params["assume_absent"]),
+            "replace": mgr.replace,
+        }
+
+        return actions[state](cfg, check_mode=check_mode)
+
+
+_ARG_SPEC = {
+    # task parameters
+    "access_token": {"type": "str", "no_log": True},
+    "organization": {"type": "str"},
+    "repository": {"type": "str", "required": True},
+    "branch": {"type": "str"},
+    "api_url": {
+        "type": "str",
+        "default": "https://api.github.com",
+    },
+    "state": {
+        "type": "str",
+        "default": "present",
+        "choices": ["present", "replace", "absent"],
+    },
+    "assume_absent": {"type": "bool", "default": False},
+    # file parameters
+    "path": {"type": "str", "required": True},
+    "message": {"type": "str", "required": True},
+    "content": {"type": "raw"},
+    "source": {"type": "str"},
+}
 
 
 def main():
     """Main module entry point."""
 
-    runner = FileRunner(
-        # task parameters
-        access_token={"type": "str", "no_log": True},
-        organization={"type": "str"},
-        repository={"type": "str", "required": True},
-        branch={"type": "str"},
-        api_url={
-            "type": "str",
-            "default": "https://api.github.com",
-        },
-        state={
-            "type": "str",
-            "default": "present",
-            "choices": ["present", "replace", "absent"],
-        },
-        # file parameters
-        path={"type": "str", "required": True},
-        message={"type": "str", "required": True},
-        content={"type": "raw"},
-        source={"type": "str"},
-    )
+    runner = FileRunner(_ARG_SPEC)
 
     runner()
 
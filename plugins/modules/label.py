@@ -1,19 +1,30 @@
 """Configure a Github repository label."""
 
-import re
 from dataclasses import dataclass
-from typing import Optional
-
-from github.GithubException import UnknownObjectException
-from github.Label import Label
-
-from ..module_utils.ghutil import GithubObjectConfig, ghconnect
+from functools import partial
+from typing import TYPE_CHECKING, Optional
+from urllib.parse import quote
+
+from ..module_utils.ghutil import (
+    GithubObjectConfig,
+    conditional_get,
+    ghrepo,
+    prime_cache,
+)
 from ..module_utils.runner import TaskRunner
 
-label_color_re = re.compile(r"^[0-9a-fA-F]{6}$")
+# github imports are deferred to the methods that need them; Ansible forks a
+# fresh interpreter per task, and the PyGithub tree is expensive to import
+if TYPE_CHECKING:
+    from github.Label import Label
+
+# task-level parameters, as opposed to parameters for the label itself
+_TASK_KEYS = frozenset(
+    {"access_token", "organization", "repository", "api_url", "state", "assume_absent"}
+)
 
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class LabelConfig(GithubObjectConfig):
     """Configuration for github.Label objects."""
 
@@ -25,34 +36,47 @@ class LabelConfig(GithubObjectConfig):
         if self.color is None:
             raise ValueError("'color' cannot be None")
 
-        if not label_color_re.match(self.color):
-            raise ValueError("'color' must be a valid hex color")
+        # bytes.fromhex gives a C-level hex check without the regex machinery;
+        # the isalnum guard rejects the whitespace that fromhex would skip
+        try:
+            if len(self.color) != 6 or not self.color.isalnum():
+                raise ValueError
+            bytes.fromhex(self.color)
+        except ValueError:
+            raise ValueError("'color' must be a valid hex color") from None
 
 
 class LabelManager:
     """Manage labels in a Github repository."""
 
+    __slots__ = ("repo",)
+
     def __init__(self, repo, token=None, org=None, base_url=None):
-        owner = ghconnect(token, organization=org, base_url=base_url)
-        self.repo = owner.get_repo(name=repo)
+        self.repo = ghrepo(repo, token=token, organization=org, base_url=base_url)
 
-    def get(self, name) -> Label:
+    def _label_url(self, name):
+        return f"{self.repo.url}/labels/{quote(name)}"
+
+    def get(self, name) -> "Label":
         """Get the named label from this manager.
 
-        If the label does not exist, this method returns `None`.
+        If the label does not exist, this method returns `None`.  Lookups use
+        conditional requests, so an unchanged label is served from the ETag
+        cache without counting against the API rate limit.
         """
-        label = None
+        from github.GithubException import UnknownObjectException
+        from github.Label import Label
 
         try:
-            label = self.repo.get_label(name=name)
+            data = conditional_get(self.repo.requester, self._label_url(name))
         except UnknownObjectException:
             return None
 
-        return label
+        return Label(self.repo.requester, headers={}, attributes=data, completed=True)
 
-    def absent(self, name, check_mode=False):
-        """Delete the named label."""
-        label = self.get(name=name)
+    def absent(self, config: LabelConfig, check_mode=False):
+        """Delete the configured label."""
+        label = self.get(name=config.name)
 
         if label is None:
             return {"changed": False}
@@ -62,31 +86,53 @@ class LabelManager:
 
         return {"changed": True}
 
-    def present(self, config: LabelConfig, check_mode=False):
+    def present(self, config: LabelConfig, check_mode=False, assume_absent=False):
         """Ensure that the label configuration exists.
 
         If the label does not exist, it will be created based on the provided
         configuration.  If the label exists, it will be modified to match the
         given configuration.
+
+        When `assume_absent` is set, the label is created directly without the
+        usual existence probe; if it turns out to exist after all, this method
+        falls back to the probe-and-edit path.
         """
+        if assume_absent and not check_mode:
+            from github.GithubException import GithubException
+
+            try:
+                label = self.repo.create_label(**config.asdict())
+            except GithubException as err:
+                if err.status != 422:
+                    raise
+
+                # the label existed after all; take the normal path
+                return self.present(config, check_mode=check_mode)
+
+            prime_cache(self._label_url(label.name), label.raw_data)
+
+            return {"changed": True, "label": label.raw_data}
+
         result = {"changed": False, "label": None}
 
         label = self.get(name=config.name)
-        new_data = config.asdict()
 
         if label is None:
             result["changed"] = True
 
             if not check_mode:
-                label = self.repo.create_label(**new_data)
+                label = self.repo.create_label(**config.asdict())
 
         elif config != label:
             result["changed"] = True
 
             if not check_mode:
-                label.edit(**new_data)
+                label.edit(**config.asdict())
 
-        result["label"] = label.raw_data
+        if label is not None:
+            # record the write result so a follow-up lookup is served locally
+            prime_cache(self._label_url(label.name), label.raw_data)
+            result["label"] = label.raw_data
 
         return result
 
@@ -94,53 +140,58 @@ class LabelManager:
 class LabelRunner(TaskRunner):
     """Runner for the jheddings.github.label task."""
 
+    __slots__ = ()
+
     def apply(self, state, params, check_mode=False):
         mod = LabelManager(
-            token=params.pop("access_token", None),
-            org=params.pop("organization", None),
-            repo=params.pop("repository"),
-            base_url=params.pop("api_url", None),
+            token=params.get("access_token"),
+            org=params.get("organization"),
+            repo=params.get("repository"),
+            base_url=params.get("api_url"),
         )
 
-        cfg = LabelConfig(**params)
-
-        if state == "absent":
-            result = mod.absent(cfg.name, check_mode=check_mode)
-
-        elif state == "present":
-            result = mod.present(cfg, check_mode=check_mode)
-
-        return result
+        cfg = LabelConfig(**{k: v for k, v in params.items() if k not in _TASK_KEYS})
+
+        actions = {
+            "absent": mod.absent,
+            "present": partial(mod.present, assume_absent=params["assume_absent"]),
+        }
+
+        return actions[state](cfg, check_mode=check_mode)
+
+
+_ARG_SPEC = {
+    # task parameters
+    "access_token": {"type": "str", "no_log": True},
+    "organization": {"type": "str"},
+    "repository": {"type": "str", "required": True},
+    "api_url": {
+        "type": "str",
+        "default": "https://api.github.com",
+    },
+    "state": {
+        "type": "str",
+        "default": "present",
+        "choices": [
+            "present",
+            "absent",
+        ],
+    },
+    "assume_absent": {"type": "bool", "default": False},
+    # label parameters
+    "name": {"type": "str", "required": True},
+    "color": {
+        "type": "str",
+        "default": "cccccc",
+    },
+    "description": {"type": "str"},
+}
 
 
 def main():
     """Main module entry point."""
 
-    runner = LabelRunner(
-        # task parameters
-        access_token={"type": "str", "no_log": True},
-        organization={"type": "str"},
-        repository={"type": "str", "required": True},
-        api_url={
-            "type": "str",
-            "default": "https://api.github.com",
-        },
-        state={
-            "type": "str",
-            "default": "present",
-            "choices": [
-                "present",
-                "absent",
-            ],
-        },
-        # label parameters
-        name={"type": "str", "required": True},
-        color={
-            "type": "str",
-            "default": "cccccc",
-        },
-        description={"type": "str"},
-    )
+    runner = LabelRunner(_ARG_SPEC)
 
     runner()
 
@@ -1,16 +1,26 @@
 """Configure a Github repository."""
 
 from dataclasses import dataclass
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
+
+from ..module_utils.ghutil import (
+    GithubObjectConfig,
+    conditional_get,
+    ghclient,
+    ghconnect,
+)
+from ..module_utils.runner import TaskRunner
 
-from github.GithubException import UnknownObjectException
-from github.Repository import Repository
+# github imports are deferred to the methods that need them; Ansible forks a
+# fresh interpreter per task, and the PyGithub tree is expensive to import
+if TYPE_CHECKING:
+    from github.Repository import Repository
 
-from ..module_utils.ghutil import GithubObjectConfig, ghconnect
-from ..module_utils.runner import TaskRunner
+# task-level parameters, as opposed to parameters for the repository itself
+_TASK_KEYS = frozenset({"access_token", "organization", "api_url", "state"})
 
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class RepositoryConfig(GithubObjectConfig):
     """Configuration for github.Repository objects."""
 
@@ -41,30 +51,71 @@ class RepositoryConfig(GithubObjectConfig):
     #   - default_branch
     #   - allow_auto_merge
 
+    # parameters accepted at creation time but not by edit()
+    _CREATE_ONLY = frozenset({"auto_init"})
+
+    def edit_kwargs(self):
+        """Return the config fields that may be passed to `Repository.edit`."""
+        return {
+            key: val
+            for key, val in self.asdict().items()
+            if key not in self._CREATE_ONLY
+        }
+
 
 class RepositoryManager:
     """Manage state of a Github repository."""
 
+    __slots__ = ("client", "_token", "_org", "_base_url", "_owner")
+
     def __init__(self, token=None, org=None, base_url=None):
-        self.owner = ghconnect(token, organization=org, base_url=base_url)
+        self.client = ghclient(token, base_url=base_url)
+        self._token = token
+        self._org = org
+        self._base_url = base_url
+        self._owner = None
+
+    @property
+    def owner(self):
+        """Return the owner for this manager, resolved on first use.
+
+        Lookups and edits address the repository directly, so the owner is
+        only materialized for operations that need it (such as create).
+        """
+        if self._owner is None:
+            self._owner = ghconnect(
+                self._token, organization=self._org, base_url=self._base_url
+            )
+
+        return self._owner
 
-    def get(self, name) -> Repository:
+    def _repo_url(self, name):
+        login = self._org or self.owner.login
+
+        return f"{self.client.requester.base_url}/repos/{login}/{name}"
+
+    def get(self, name) -> "Repository":
         """Get the named repository.
 
-        If the repository does not exist, this method returns `None`.
+        If the repository does not exist, this method returns `None`.  Lookups
+        use conditional requests, so an unchanged repository is served from the
+        ETag cache without counting against the API rate limit.
         """
-        repo = None
+        from github.GithubException import UnknownObjectException
+        from github.Repository import Repository
 
         try:
-            repo = self.owner.get_repo(name=name)
+            data = conditional_get(self.client.requester, self._repo_url(name))
         except UnknownObjectException:
-            pass
+            return None
 
-        return repo
+        return Repository(
+            self.client.requester, headers={}, attributes=data, completed=True
+        )
 
-    def absent(self, name, check_mode=False):
-        """Delete the named repository."""
-        repo = self.get(name=name)
+    def absent(self, config: RepositoryConfig, check_mode=False):
+        """Delete the configured repository."""
+        repo = self.get(name=config.name)
 
         if repo is None:
             return {"changed": False}
@@ -74,11 +125,15 @@ class RepositoryManager:
 
         return {"changed": True}
 
-    def archived(self, name, check_mode=False):
-        """Archive the named repository."""
-        repo = self.owner.get_repo(name=name)
+    def archived(self, config: RepositoryConfig, check_mode=False):
+        """Archive the configured repository.
 
-        if not repo.archived():
+        If the repository does not exist or is already archived, this method
+        does nothing.
+        """
+        repo = self.get(name=config.name)
+
+        if repo is None or repo.raw_data.get("archived"):
             return {"changed": False}
 
         if not check_mode:
@@ -95,15 +150,14 @@ class RepositoryManager:
         result = {"changed": False, "repo": None}
 
         repo = self.get(name=config.name)
-        new_data = config.asdict()
 
         if repo is None:
             if not check_mode:
-                repo = self.owner.create_repo(**new_data)
+                repo = self.owner.create_repo(**config.asdict())
 
             result["changed"] = True
 
-        result["repo"] = repo.raw_data
+        result["repo"] = None if repo is None else repo.raw_data
 
         return result
 
@@ -115,24 +169,33 @@ class RepositoryManager:
         result = {"changed": False, "repo": None}
 
         repo = self.get(name=config.name)
-        new_data = config.asdict()
 
         if repo is None:
+            # a freshly-created repo already matches the config; skip the edit
             if not check_mode:
-                repo = self.owner.create_repo(**new_data)
+                repo = self.owner.create_repo(**config.asdict())
 
             result["changed"] = True
 
-        if config != repo:
-            # remove create-only parameters
-            new_data.pop("auto_init", None)
+        else:
+            from github.GithubObject import NotSet
 
-            if not check_mode:
-                repo.edit(**new_data)
+            raw = repo.raw_data
 
-            result["changed"] = True
+            # edit only the settings that actually differ
+            changes = {
+                key: val
+                for key, val in config.edit_kwargs().items()
+                if val is not NotSet and raw.get(key) != val
+            }
 
-        result["repo"] = repo.raw_data
+            if changes:
+                if not check_mode:
+                    repo.edit(**changes)
+
+                result["changed"] = True
+
+        result["repo"] = None if repo is None else repo.raw_data
 
         return result
 
@@ -140,67 +203,69 @@ class RepositoryManager:
 class RepositoryRunner(TaskRunner):
     """Runner for the jheddings.github.repository task."""
 
+    __slots__ = ()
+
     def apply(self, state, params, check_mode=False):
         mgr = RepositoryManager(
-            token=params.pop("access_token", None),
-            org=params.pop("organization", None),
-            base_url=params.pop("api_url", None),
+            token=params.get("access_token"),
+            org=params.get("organization"),
+            base_url=params.get("api_url"),
         )
 
-        cfg = RepositoryConfig(**params)
-
-        if state == "absent":
-            result = mgr.absent(cfg.name, check_mode=check_mode)
-
-        elif state == "archived":
-            result = mgr.archived(cfg.name, check_mode=check_mode)
-
-        elif state == "replace":
-            result = mgr.replace(cfg, check_mode=check_mode)
-
-        elif state == "present":
-            result = mgr.present(cfg, check_mode=check_mode)
+        cfg = RepositoryConfig(
+            **{k: v for k, v in params.items() if k not in _TASK_KEYS}
+        )
 
-        return result
+        actions = {
+            "absent": mgr.absent,
+            "archived": mgr.archived,
+            "replace": mgr.replace,
+            "present": mgr.present,
+        }
+
+        return actions[state](cfg, check_mode=check_mode)
+
+
+_ARG_SPEC = {
+    # task parameters
+    "access_token": {"type": "str", "no_log": True},
+    "organization": {"type": "str"},
+    "api_url": {
+        "type": "str",
+        "default": "https://api.github.com",
+    },
+    "state": {
+        "type": "str",
+        "default": "present",
+        "choices": [
+            "present",
+            "replace",
+            "absent",
+            "archived",
+        ],
+    },
+    # repo parameters
+    "name": {"type": "str", "required": True},
+    "description": {"type": "str"},
+    "homepage": {"type": "str"},
+    "private": {"type": "bool"},
+    "has_issues": {"type": "bool"},
+    "has_downloads": {"type": "bool"},
+    "has_wiki": {"type": "bool"},
+    "has_projects": {"type": "bool"},
+    "allow_merge_commit": {"type": "bool"},
+    "allow_squash_merge": {"type": "bool"},
+    "allow_rebase_merge": {"type": "bool"},
+    "delete_branch_on_merge": {"type": "bool"},
+    # create parameters
+    "auto_init": {"type": "bool"},
+}
 
 
 def main():
     """Main module entry point."""
 
-    runner = RepositoryRunner(
-        # task parameters
-        access_token={"type": "str", "no_log": True},
-        organization={"type": "str"},
-        api_url={
-            "type": "str",
-            "default": "https://api.github.com",
-        },
-        state={
-            "type": "str",
-            "default": "present",
-            "choices": [
-                "present",
-                "replace",
-                "absent",
-                "archived",
-            ],
-        },
-        # repo parameters
-        name={"type": "str", "required": True},
-        description={"type": "str"},
-        homepage={"type": "str"},
-        private={"type": "bool"},
-        has_issues={"type": "bool"},
-        has_downloads={"type": "bool"},
-        has_wiki={"type": "bool"},
-        has_projects={"type": "bool"},
-        allow_merge_commit={"type": "bool"},
-        allow_squash_merge={"type": "bool"},
-        allow_rebase_merge={"type": "bool"},
-        delete_branch_on_merge={"type": "bool"},
-        # create parameters
-        auto_init={"type": "bool"},
-    )
+    runner = RepositoryRunner(_ARG_SPEC)
 
     runner()
 
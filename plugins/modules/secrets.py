@@ -2,12 +2,18 @@
 
 from dataclasses import dataclass
 from typing import Optional
+from urllib.parse import quote
 
-from ..module_utils.ghutil import GithubObjectConfig, ghconnect
+from ..module_utils.ghutil import GithubObjectConfig, ghrepo
 from ..module_utils.runner import TaskRunner
 
+# task-level parameters, as opposed to parameters for the secret itself
+_TASK_KEYS = frozenset(
+    {"access_token", "organization", "repository", "api_url", "state"}
+)
 
-@dataclass(eq=False)
+
+@dataclass(eq=False, slots=True)
 class SecretsConfig(GithubObjectConfig):
     """Configuration for secrets."""
 
@@ -18,80 +24,112 @@ class SecretsConfig(GithubObjectConfig):
 class SecretsManager:
     """Manage secrets in a Github repository."""
 
+    __slots__ = ("repo",)
+
+    # public keys are stable per repository; fetch each at most once per process
+    _public_keys = {}
+
     def __init__(self, repo, token=None, org=None, base_url=None):
-        owner = ghconnect(token, organization=org, base_url=base_url)
-        self.repo = owner.get_repo(name=repo)
+        self.repo = ghrepo(repo, token=token, organization=org, base_url=base_url)
+
+    def _public_key(self):
+        key = self._public_keys.get(self.repo.full_name)
 
-    def absent(self, name):
-        """Delete a secret."""
+        if key is None:
+            key = self.repo.get_public_key()
+            self._public_keys[self.repo.full_name] = key
 
-        if self.repo.delete_secret(secret_name=name):
+        return key
+
+    def absent(self, config: SecretsConfig):
+        """Delete the configured secret."""
+
+        if self.repo.delete_secret(secret_name=config.name):
             return {"changed": True}
 
         return {"changed": False}
 
-    def present(self, name, value):
-        """Create a secret.
+    def present(self, config: SecretsConfig):
+        """Create the configured secret.
 
         Since secrets are encrypted, we cannot check if the secret already exists.  As
         a result, this method will always return `changed: True` on success.
         """
 
-        if self.repo.create_secret(secret_name=name, unencrypted_value=value):
-            return {"changed": True, "name": name}
+        # encrypt locally with the cached public key and PUT the payload
+        # directly; create_secret would re-fetch the key on every call
+        key = self._public_key()
 
-        return {"changed": False, "name": name}
+        payload = {
+            "encrypted_value": key.encrypt(config.value),
+            "key_id": key.key_id,
+        }
+
+        self.repo.requester.requestJsonAndCheck(
+            "PUT",
+            f"{self.repo.url}/actions/secrets/{quote(config.name)}",
+            input=payload,
+        )
+
+        return {"changed": True, "name": config.name}
 
 
 class SecretsRunner(TaskRunner):
     """Runner for the jheddings.github.label task."""
 
+    __slots__ = ()
+
     def apply(self, state, params, check_mode=False):
         if check_mode:
             raise ValueError("check_mode is not supported for this module")
 
         mod = SecretsManager(
-            token=params.pop("access_token", None),
-            org=params.pop("organization", None),
-            repo=params.pop("repository"),
-            base_url=params.pop("api_url", None),
+            token=params.get("access_token"),
+            org=params.get("organization"),
+            repo=params.get("repository"),
+            base_url=params.get("api_url"),
         )
 
-        cfg = SecretsConfig(**params)
-
-        if state == "absent":
-            return mod.absent(cfg.name)
-
-        if state == "present":
-            return mod.present(cfg.name, cfg.value)
-
-        raise ValueError(f"unknown state: {state}")
+        cfg = SecretsConfig(**{k: v for k, v in params.items() if k not in _TASK_KEYS})
+
+        actions = {
+            "absent": mod.absent,
+            "present": mod.present,
+        }
+
+        if state not in actions:
+            raise ValueError(f"unknown state: {state}")
+
+        return actions[state](cfg)
+
+
+_ARG_SPEC = {
+    # task parameters
+    "access_token": {"type": "str", "no_log": True},
+    "organization": {"type": "str"},
+    "repository": {"type": "str", "required": True},
+    "api_url": {
+        "type": "str",
+        "default": "https://api.github.com",
+    },
+    "state": {
+        "type": "str",
+        "default": "present",
+        "choices": [
+            "present",
+            "absent",
+        ],
+    },
+    # secrets parameters
+    "name": {"type": "str", "required": True},
+    "value": {"type": "str"},
+}
 
 
 def main():
     """Main module entry point."""
 
-    runner = SecretsRunner(
-        # task parameters
-        access_token={"type": "str", "no_log": True},
-        organization={"type": "str"},
-        repository={"type": "str", "required": True},
-        api_url={
-            "type": "str",
-            "default": "https://api.github.com",
-        },
-        state={
-            "type": "str",
-            "default": "present",
-            "choices": [
-                "present",
-                "absent",
-            ],
-        },
-        # secrets parameters
-        name={"type": "str", "required": True},
-        value={"type": "str"},
-    )
+    runner = SecretsRunner(_ARG_SPEC)
 
     runner()
 